@@ -1,16 +1,17 @@
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
-import networkx as nx
 import pandas as pd
 import numpy as np
 import geopandas as gpd
 
 from shapely.geometry import Point, LineString, MultiPoint, MultiLineString
 from shapely.ops import split, unary_union
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 pd.set_option('precision', 10)
 
-from .graph import graph_fromGDF
+from .graph import _nodes_degree
 from .utilities import center_line
 
 """
@@ -39,25 +40,22 @@ def duplicate_nodes(nodes_gdf, edges_gdf):
         nodes_gdf.index = nodes_gdf.nodeID
     nodes_gdf, edges_gdf =  nodes_gdf.copy(), edges_gdf.copy()
     
-    # detecting duplicate geometries
-    G = nodes_gdf["geometry"].apply(lambda geom: geom.wkb)
-    new_nodes = nodes_gdf.loc[G.drop_duplicates().index]
+    # detecting duplicate geometries, on the basis of the nodes' coordinates: each (x, y) row is compared as a single key 
+    # and every node is associated with the position of the first node sharing its coordinates
+    coordinates = np.column_stack([nodes_gdf.geometry.x.to_numpy(), nodes_gdf.geometry.y.to_numpy()])
+    _, first, inverse = np.unique(coordinates, axis = 0, return_index = True, return_inverse = True)
+    canonical = first[inverse]
+    duplicates = canonical != np.arange(len(nodes_gdf))
+    new_nodes = nodes_gdf[~duplicates]
     
     # assign univocal nodeID to edges which have 'u' or 'v' referring to duplicate nodes
-    to_edit = list(set(nodes_gdf.index.values.tolist()) - set((new_nodes.index.values.tolist())))
-    
-    if len(to_edit) == 0: 
+    if not duplicates.any(): 
         return(nodes_gdf, edges_gdf) 
     
-    # readjusting edges' nodes too, accordingly
-    for node in to_edit:
-        geo = nodes_gdf.loc[node].geometry
-        tmp = new_nodes[new_nodes.geometry == geo]
-        index = tmp.iloc[0].nodeID
-        
-        # assigning the unique index to edges
-        edges_gdf.loc[edges_gdf.u == node,'u'] = index
-        edges_gdf.loc[edges_gdf.v == node,'v'] = index
+    # readjusting edges' nodes too, accordingly: each duplicate is mapped to the first node with the same coordinates
+    to_edit = dict(zip(nodes_gdf.index[duplicates], nodes_gdf['nodeID'].to_numpy()[canonical[duplicates]]))
+    edges_gdf['u'] = edges_gdf['u'].map(to_edit).fillna(edges_gdf['u']).astype('int64')
+    edges_gdf['v'] = edges_gdf['v'].map(to_edit).fillna(edges_gdf['v']).astype('int64')
         
     return new_nodes, edges_gdf
     
@@ -81,12 +79,12 @@ def fix_dead_ends(nodes_gdf, edges_gdf):
     nodes_gdf =  nodes_gdf.copy()
     edges_gdf = edges_gdf.copy()
 
-    to_delete = {k: v for k, v in nodes_degree(edges_gdf).items() if v == 1}
-    if len(to_delete) == 0: 
+    degrees = _nodes_degree(edges_gdf)
+    to_delete_list = list(degrees.index[degrees == 1])
+    if len(to_delete_list) == 0: 
         return(nodes_gdf, edges_gdf)
     
     # removing edges and nodes
-    to_delete_list = list(to_delete.keys())
     nodes_gdf.drop(to_delete_list, axis = 0 , inplace = True)
     edges_gdf = edges_gdf[(~edges_gdf['u'].isin(to_delete_list)) & (~edges_gdf['v'].isin(to_delete_list))]
 
@@ -106,17 +104,12 @@ def is_nodes_simplified(nodes_gdf, edges_gdf):
     boolean
     """
     
-    simplified = True
-    to_edit = {k: v for k, v in nodes_degree(edges_gdf).items() if v == 2}
+    degrees = _nodes_degree(edges_gdf)
     if 'stationID' in nodes_gdf.columns: # for transport networks
-        to_edit_list = list(to_edit.keys())
-        tmp_nodes = nodes_gdf[(nodes_gdf.nodeID.isin(to_edit_list)) & (nodes_gdf.stationID == 999999)].copy()
-        to_edit = list(tmp_nodes.nodeID)
-    
-    if len(to_edit) == 0: 
-        return simplified
+        to_edit = degrees.index[degrees == 2]
+        return not (nodes_gdf.nodeID.isin(to_edit) & (nodes_gdf.stationID == 999999)).any()
             
-    return False
+    return not (degrees == 2).any()
 
 def is_edges_simplified(edges_gdf):
     """
@@ -132,18 +125,9 @@ def is_edges_simplified(edges_gdf):
     boolean
     """
     
-    simplified = True 
+    edges_gdf['code'] = _edges_code(edges_gdf)
     
-    edges_gdf['code'] = None
-    edges_gdf['code'][edges_gdf['v'] >= edges_gdf['u']] = edges_gdf.u.astype(str)+"-"+edges_gdf.v.astype(str)
-    edges_gdf['code'][edges_gdf['v'] < edges_gdf['u']] = edges_gdf.v.astype(str)+"-"+edges_gdf.u.astype(str)
-    dd = dict(edges_gdf['code'].value_counts())
-    dd = {k: v for k, v in dd.items() if v > 1}
-    
-    if len(dd) > 0: 
-        simplified = False
-    
-    return simplified
+    return not edges_gdf['code'].duplicated().any()
 
 def simplify_graph(nodes_gdf, edges_gdf):
     """
@@ -165,10 +149,10 @@ def simplify_graph(nodes_gdf, edges_gdf):
     nodes_gdf, edges_gdf = nodes_gdf.copy(), edges_gdf.copy()
         
     # editing the nodes which only connect two edges
-    to_edit = {k: v for k, v in nodes_degree(edges_gdf).items() if v == 2}
-    if len(to_edit) == 0: 
+    degrees = _nodes_degree(edges_gdf)
+    to_edit_list = list(degrees.index[degrees == 2])
+    if len(to_edit_list) == 0: 
         return(nodes_gdf, edges_gdf)
-    to_edit_list = list(to_edit.keys())
     
     if 'stationID' in nodes_gdf.columns:
         tmp_nodes = nodes_gdf[(nodes_gdf.nodeID.isin(to_edit_list)) & (nodes_gdf.stationID == 999999)].copy()
@@ -176,59 +160,119 @@ def simplify_graph(nodes_gdf, edges_gdf):
         if len(to_edit_list) == 0: 
             return(nodes_gdf, edges_gdf)
 
-    for nodeID in to_edit_list:
-
-        tmp = edges_gdf[(edges_gdf['u'] == nodeID) | (edges_gdf['v'] == nodeID)].copy()    
-        if len(tmp) == 0: 
-            nodes_gdf.drop(nodeID, axis = 0, inplace = True)
+    # incident segments (positions) of each node
+    positions = np.arange(len(edges_gdf))
+    incidence = pd.concat([pd.DataFrame({'node': edges_gdf['u'].values, 'position': positions}), 
+                           pd.DataFrame({'node': edges_gdf['v'].values, 'position': positions})])
+    incident = incidence.groupby('node')['position'].agg(list).to_dict()
+    
+    # merging the segments on the basis of their nodes only
+    u_arr, v_arr = edges_gdf['u'].to_numpy(copy = True), edges_gdf['v'].to_numpy(copy = True)
+    dropped, pieces, to_drop = _merge_pseudo_nodes(u_arr, v_arr, incident, to_edit_list)
+    
+    # building each merged geometry once, from its ordered pieces
+    old_geometries = edges_gdf['geometry'].to_numpy()
+    geometries = edges_gdf['geometry'].to_numpy(copy = True)
+    pedestrian = edges_gdf['pedestrian'].to_numpy(copy = True) if 'highway' in edges_gdf.columns else None
+    lengths = edges_gdf['length'].to_numpy(copy = True) if 'length' in edges_gdf.columns else None
+    
+    for position, line_pieces in pieces.items():
+        if dropped[position]: 
             continue
-        if len(tmp) == 1: 
-            continue # possible dead end
-        
-        # dead end identified
-        index_first, index_second = tmp.iloc[0].edgeID, tmp.iloc[1].edgeID # first segment index
-        
-        # Identifying the relationship between the two segments.
-        # New node_u and node_v are assigned accordingly. A list of ordered coordinates is obtained for 
-        # merging the geometries. 4 conditions:
-        if (tmp.iloc[0]['u'] == tmp.iloc[1]['u']):  
-            edges_gdf.at[index_first,'u'] = edges_gdf.loc[index_first]['v']
-            edges_gdf.at[index_first,'v'] = edges_gdf.loc[index_second]['v']
-            line_coordsA, line_coordsB = list(tmp.iloc[0]['geometry'].coords), list(tmp.iloc[1]['geometry'].coords)    
-            line_coordsA.reverse()
+        line_coords = [np.asarray(old_geometries[piece].coords) for piece, _ in line_pieces]
+        line_coords = [coords[::-1] if reverse else coords for coords, (_, reverse) in zip(line_coords, line_pieces)]
+        geometries[position] = LineString(np.concatenate(line_coords))
+        merged = [piece for piece, _ in line_pieces]
+        if pedestrian is not None: # type of street
+            pedestrian[position] = pedestrian[merged].max()
+        if lengths is not None:
+            lengths[position] = lengths[merged].sum()
+    
+    edges_gdf['u'], edges_gdf['v'], edges_gdf['geometry'] = u_arr, v_arr, geometries
+    if pedestrian is not None: 
+        edges_gdf['pedestrian'] = pedestrian
+    if lengths is not None: 
+        edges_gdf['length'] = lengths
+    edges_gdf = edges_gdf[~dropped]
+    nodes_gdf.drop(to_drop, axis = 0, inplace = True)
+    
+    return nodes_gdf, edges_gdf
+
+def _merge_pseudo_nodes(u, v, incident, to_edit):
+    """
+    It supports the simplify_graph function by contracting, on the basis of the u and v arrays only, each chain of segments connected by pseudo-nodes.
+    Every chain is walked once, from one of its pseudo-nodes towards its two extremities, and replaced by the segment with the lowest position in it,
+    whose direction is preserved. The u and v arrays are updated in place. Each merged segment is described as a sequence of pieces, namely the positions 
+    of the original segments that compose it and whether their coordinates have to be reversed; the geometries are thus built only once, at the end.
+    
+    Parameters
+    ----------
+    u: numpy array
+        the from nodes of the segments
+    v: numpy array
+        the to nodes of the segments
+    incident: dictionary
+        the positions of the segments incident to each node
+    to_edit: list
+        the nodeIDs of the pseudo-nodes
         
-        elif (tmp.iloc[0]['u'] == tmp.iloc[1]['v']): 
-            edges_gdf.at[index_first,'u'] = edges_gdf.loc[index_second]['u']
-            line_coordsA, line_coordsB = list(tmp.iloc[1]['geometry'].coords), list(tmp.iloc[0]['geometry'].coords)               
+    Returns
+    -------
+    tuple
+    """
+    
+    dropped = np.zeros(len(u), dtype = bool)
+    pieces = {}
+    to_drop = [nodeID for nodeID in to_edit if len(incident.get(nodeID, [])) == 0]
+    # pseudo-nodes connecting two different segments (a self-loop is not merged)
+    pseudo_nodes = {nodeID : sorted(set(incident[nodeID])) for nodeID in to_edit if len(set(incident.get(nodeID, []))) == 2}
+    visited = set()
+    
+    def walk(nodeID, position):
+        # from nodeID through the segment in position, until a node which is not a pseudo-node is reached
+        chain = []
+        while True:
+            reverse = (u[position] != nodeID)
+            chain.append((position, reverse))
+            nodeID = u[position] if reverse else v[position]
+            if (nodeID not in pseudo_nodes) or (nodeID in visited): 
+                return chain, nodeID
+            visited.add(nodeID)
+            first, second = pseudo_nodes[nodeID]
+            position = second if first == position else first
+    
+    for nodeID in to_edit:
+        if (nodeID not in pseudo_nodes) or (nodeID in visited): 
+            continue
+        visited.add(nodeID)
+        first, second = pseudo_nodes[nodeID]
+        backward, node_from = walk(nodeID, first)
+        if node_from == nodeID: # the chain is a ring of pseudo-nodes
+            forward, node_to = [], nodeID
+        else: 
+            forward, node_to = walk(nodeID, second)
         
-        elif (tmp.iloc[0]['v'] == tmp.iloc[1]['u']): 
-            edges_gdf.at[index_first,'v'] = edges_gdf.loc[index_second]['v']
-            line_coordsA, line_coordsB = list(tmp.iloc[0]['geometry'].coords), list(tmp.iloc[1]['geometry'].coords)  
+        # ordered pieces, from node_from to node_to
+        chain = [(position, not reverse) for position, reverse in backward[::-1]] + forward
+        positions = [position for position, _ in chain]
+        to_drop.extend([node for node in set(u[positions]) | set(v[positions]) if node in pseudo_nodes])
         
-        else: # (tmp.iloc[0]['v'] == tmp.iloc[1]['v']) 
-            edges_gdf.at[index_first,'v'] = edges_gdf.loc[index_second]['u']
-            line_coordsA, line_coordsB = list(tmp.iloc[0]['geometry'].coords), list(tmp.iloc[1]['geometry'].coords)
-            line_coordsB.reverse()
-
         # checking that none edges with node_u == node_v have been created, if yes: drop them
-        if edges_gdf.loc[index_first].u == edges_gdf.loc[index_first].v: 
-            edges_gdf.drop([index_first, index_second], axis = 0, inplace = True)
-            nodes_gdf.drop(nodeID, axis = 0, inplace = True)
+        if node_from == node_to:
+            dropped[positions] = True
             continue
         
-        # obtaining coordinates-list in consistent order and merging
-        new_line = line_coordsA + line_coordsB
-        merged_line = LineString([coor for coor in new_line]) 
-        edges_gdf.at[index_first, 'geometry'] = merged_line
+        # the merged segment takes the place of the one with the lowest position, the others are dropped
+        keep = min(positions)
+        if dict(chain)[keep]: 
+            chain = [(position, not reverse) for position, reverse in chain[::-1]]
+            node_from, node_to = node_to, node_from
+        u[keep], v[keep] = node_from, node_to
+        pieces[keep] = chain
+        dropped[positions] = True
+        dropped[keep] = False
         
-        if 'highway' in edges_gdf.columns: #type of street 
-            if edges_gdf.loc[index_second]['pedestrian']: 
-                edges_gdf.at[index_first, 'pedestrian'] = 1        
-        # dropping the second segment, as the new geometry was assigned to the first edge
-        edges_gdf.drop(index_second, axis = 0, inplace = True)
-        nodes_gdf.drop(nodeID, axis = 0, inplace = True)
-    
-    return nodes_gdf, edges_gdf
+    return dropped, pieces, to_drop
 
 
 def clean_network(nodes_gdf, edges_gdf, dead_ends = False, remove_disconnected_islands = True, same_uv_edges = True, self_loops = False, fix_topology = False):
@@ -270,110 +314,123 @@ def clean_network(nodes_gdf, edges_gdf, dead_ends = False, remove_disconnected_i
     edges_gdf.set_index('edgeID', drop = False, inplace = True, append = False)
     edges_gdf.index.name = None
 
-    nodes_gdf['x'], nodes_gdf['y'] = list(zip(*[(r.coords[0][0], r.coords[0][1]) for r in nodes_gdf.geometry]))
+    nodes_gdf['x'], nodes_gdf['y'] = nodes_gdf.geometry.x, nodes_gdf.geometry.y
     edges_gdf.sort_index(inplace = True)  
-    edges_gdf['code'], edges_gdf['coords'] = None, None
-    ix_geo = edges_gdf.columns.get_loc("geometry")+1
+    edges_gdf['code'] = None
     
     if 'highway' in edges_gdf.columns:
-        edges_gdf['pedestrian'] = 0
         to_remove = ['elevator']  
-        edges_gdf = edges_gdf[~edges_gdf.highway.isin(to_remove)]
         pedestrian = ['footway', 'pedestrian', 'living_street', 'path']
-        edges_gdf['pedestrian'][edges_gdf.highway.isin(pedestrian)] = 1
+        edges_gdf['pedestrian'] = edges_gdf.highway.isin(pedestrian).astype(int)
+        edges_gdf = edges_gdf[~edges_gdf.highway.isin(to_remove)]
     
     if dead_ends: 
         nodes_gdf, edges_gdf = fix_dead_ends(nodes_gdf, edges_gdf)
+    # lengths are computed once and then kept up to date where geometries change
+    edges_gdf['length'] = edges_gdf['geometry'].length
     cycle = 0
+    dirty = None # edges modified in the previous cycle; all the edges are examined when None
     
-    while (((not is_edges_simplified(edges_gdf)) & same_uv_edges) | (not is_nodes_simplified(nodes_gdf, edges_gdf)) | (cycle == 0)):
+    while (cycle == 0) or (same_uv_edges and (not is_edges_simplified(edges_gdf))) or (not is_nodes_simplified(nodes_gdf, edges_gdf)):
 
-        edges_gdf['length'] = edges_gdf['geometry'].length # recomputing length, to account for small changes
         cycle += 1
-            
-        nodes_gdf, edges_gdf = duplicate_nodes(nodes_gdf, edges_gdf)
+        
+        # nodes are only created by fix_network_topology, there's no need to look for new duplicates otherwise
+        if dirty is None: 
+            nodes_gdf, edges_gdf = duplicate_nodes(nodes_gdf, edges_gdf)
         if self_loops: 
             edges_gdf = edges_gdf[edges_gdf['u'] != edges_gdf['v']] #eliminate loops
-        edges_gdf = edges_gdf[~((edges_gdf['u'] == edges_gdf['v']) & (edges_gdf['geometry'].length < 1.00))] #eliminate node-lines
-        
-        # Assigning codes based on the edge's nodes. 
-        # The string is formulated putting the node with lower ID first, regardless it being 'u' or 'v'
-        edges_gdf["code"] = np.where(edges_gdf['v'] >= edges_gdf['u'], edges_gdf.u.astype(str)+"-"+edges_gdf.v.astype(str), 
-                              edges_gdf.v.astype(str)+"-"+edges_gdf.u.astype(str))
-        
-        # Reordering coordinates to allow for comparison between edges
-        edges_gdf['coords'] = [list(c.coords) for c in edges_gdf.geometry]
-        edges_gdf['coords'][(edges_gdf.u.astype(str)+"-"+edges_gdf.v.astype(str)) != edges_gdf.code] = [list(x.coords)[::-1] for x in edges_gdf.geometry]
+        edges_gdf = edges_gdf[~((edges_gdf['u'] == edges_gdf['v']) & (edges_gdf['length'] < 1.00))] #eliminate node-lines
         
-        # dropping duplicate-geometries edges
-        geometries = edges_gdf['geometry'].apply(lambda geom: geom.wkb)
-        edges_gdf = edges_gdf.loc[geometries.drop_duplicates().index]
+        # Assigning codes based on the edge's nodes, regardless of the node with lower ID being 'u' or 'v'
+        edges_gdf["code"] = _edges_code(edges_gdf)
         
-        # dropping edges with same geometry but with coords in different orders (depending on their directions)    
-        edges_gdf['tmp'] = edges_gdf['coords'].apply(tuple, 1)  
-        edges_gdf.drop_duplicates(['tmp'], keep = 'first', inplace = True)
+        # dropping duplicate-geometries edges, also when their coords are in different orders (depending on their directions).
+        # These can only be found amongst edges sharing the same code; their coordinates are reordered to allow for comparison.
+        # After the first cycle, only the codes of edges modified in the previous cycle can be repeated
+        candidates = edges_gdf[_duplicate_candidates(edges_gdf, dirty)]
+        if len(candidates) > 0:
+            to_reverse = (candidates['u'] > candidates['v']).to_numpy()
+            coords = pd.Series([tuple(c.coords)[::-1] if reverse else tuple(c.coords) for c, reverse in zip(candidates.geometry, to_reverse)], 
+                                index = candidates.index)
+            edges_gdf = edges_gdf.drop(coords.index[coords.duplicated(keep = 'first')], axis = 0)
         
         # edges with different geometries but same u-v nodes pairs
-        
-        dd = dict(edges_gdf['code'].value_counts())
-        dd = {k: v for k, v in dd.items() if v > 1} # keeping u-v combinations that appear more than once
-        # iterate through possible duplicate edges for each specific combination of possible duplicates
-        if not same_uv_edges:
-            for key,_ in dd.items():
-                tmp = edges_gdf[edges_gdf.code == key]
-                tmp['key'] = range(0, 0+len(tmp))
-        else:
-            for key,_ in dd.items():
-                tmp = edges_gdf[edges_gdf.code == key].copy()
-                # sorting the temporary GDF by length, the shortest is then used as a term of comparison
-                tmp.sort_values(['length'], ascending = True, inplace = True)
-                line_geometry, ix_line = tmp.iloc[0]['geometry'], tmp.iloc[0].edgeID
+        if same_uv_edges:
+            # working on positional arrays rather than on the GeoDataFrame
+            lengths = edges_gdf['length'].to_numpy(copy = True)
+            geometries = edges_gdf['geometry'].to_numpy(copy = True)
+            pedestrian = edges_gdf['pedestrian'].to_numpy(copy = True) if 'highway' in edges_gdf.columns else None
+            dropped = np.zeros(len(edges_gdf), dtype = bool)
+            candidates = np.flatnonzero(edges_gdf.index.isin(candidates.index))
+            groups = pd.Series(candidates).groupby(edges_gdf['code'].to_numpy()[candidates], sort = False).indices
+            
+            # iterate through possible duplicate edges for each specific combination of possible duplicates
+            for positions in groups.values():
+                positions = candidates[positions]
+                if len(positions) < 2: 
+                    continue # keeping u-v combinations that appear more than once
+                # sorting the group by length, the shortest is then used as a term of comparison
+                positions = positions[np.argsort(lengths[positions], kind = 'mergesort')]
+                ix_line = positions[0]
+                line_geometry, line_length = geometries[ix_line], lengths[ix_line]
+                ix_center_line = None
                 
                 # iterate through all the other edges with same u-v nodes                                
-                for connector in tmp.itertuples():
-                    if connector.Index == ix_line: 
-                        continue
-                    line_geometry_connector, ix_line_connector = connector[ix_geo], connector.Index 
-                    
+                for ix_line_connector in positions[1:]:
                     # if this edge is x% longer than the edge identified in the outer loop, drop it
-                    if (line_geometry_connector.length > (line_geometry.length * 1.10)): 
+                    if (lengths[ix_line_connector] > (line_length * 1.10)): 
                         pass
-                    # else draw a center-line, replace the geometry of the outer-loop segment with the CL, drop the segment of the inner-loop
+                    # else a center-line replaces the geometry of the outer-loop segment, drop the segment of the inner-loop
                     else:
-                        cl = center_line(line_geometry, line_geometry_connector)
-                        edges_gdf.at[ix_line,'geometry'] = cl
-                        if ('highway' in edges_gdf.columns) & (edges_gdf.loc[ix_line_connector]['pedestrian'] == 1): 
-                            edges_gdf.at[ix_line,'pedestrian'] = 1 
-                    edges_gdf.drop(ix_line_connector, axis = 0, inplace = True)
+                        ix_center_line = ix_line_connector
+                        if (pedestrian is not None) and (pedestrian[ix_line_connector] == 1): 
+                            pedestrian[ix_line] = 1 
+                    dropped[ix_line_connector] = True
+                
+                # each center-line would replace the previous one, only the last one is drawn
+                if ix_center_line is not None:
+                    cl = center_line(line_geometry, geometries[ix_center_line])
+                    geometries[ix_line], lengths[ix_line] = cl, cl.length
+            
+            edges_gdf['geometry'], edges_gdf['length'] = geometries, lengths
+            if pedestrian is not None: 
+                edges_gdf['pedestrian'] = pedestrian
+            edges_gdf = edges_gdf[~dropped]
                         
         if dead_ends: 
             nodes_gdf, edges_gdf = fix_dead_ends(nodes_gdf, edges_gdf)
         
         # only keep nodes which are actually used by the edges in the geodataframe
-        to_keep = list(set(list(edges_gdf['u'].unique()) + list(edges_gdf['v'].unique())))
+        to_keep = pd.Index(edges_gdf['u']).union(pd.Index(edges_gdf['v']))
         nodes_gdf = nodes_gdf[nodes_gdf['nodeID'].isin(to_keep)]
         if fix_topology: 
             nodes_gdf, edges_gdf = fix_network_topology(nodes_gdf, edges_gdf)
+            edges_gdf['length'] = edges_gdf['geometry'].length # split lines inherit the length of the original line
         
-        # simplify the graph                           
+        # simplify the graph and keep track of the edges whose nodes have changed                          
+        u_before, v_before = edges_gdf['u'], edges_gdf['v']
         nodes_gdf, edges_gdf = simplify_graph(nodes_gdf, edges_gdf) 
+        modified = ((edges_gdf['u'].to_numpy() != u_before.loc[edges_gdf.index].to_numpy()) | 
+                    (edges_gdf['v'].to_numpy() != v_before.loc[edges_gdf.index].to_numpy()))
+        dirty = None if fix_topology else edges_gdf.index[modified]
     
-    nodes_gdf['x'], nodes_gdf['y'] = list(zip(*[(r.coords[0][0], r.coords[0][1]) for r in nodes_gdf.geometry]))
-    edges_gdf.drop(['code', 'coords', 'tmp'], axis = 1, inplace = True, errors = 'ignore') # remove temporary columns
+    nodes_gdf['x'], nodes_gdf['y'] = nodes_gdf.geometry.x, nodes_gdf.geometry.y
+    edges_gdf.drop(['code'], axis = 1, inplace = True, errors = 'ignore') # remove temporary columns
     nodes_gdf['nodeID'] = nodes_gdf.nodeID.astype(int)
     edges_gdf = correct_edges(nodes_gdf, edges_gdf) # correct edges coordinates
     edges_gdf['length'] = edges_gdf['geometry'].length
     
     # check if there are disconnected islands and remove nodes and edges belongings to these islands.
     if remove_disconnected_islands:
-        Ng = graph_fromGDF(nodes_gdf, edges_gdf, 'nodeID')
-        if not nx.is_connected(Ng):  
-            largest_component = max(nx.connected_components(Ng), key=len)
-            # Create a subgraph of Ng consisting only of this component:
-            G = Ng.subgraph(largest_component)
-
-            to_drop = [item for item in list(nodes_gdf.nodeID) if item not in list(G.nodes())]
-            nodes_gdf.drop(to_drop, axis = 0 , inplace = True)
+        # sparse adjacency matrix, built on the nodes' positions
+        ix_u, ix_v = nodes_gdf.index.get_indexer(edges_gdf['u']), nodes_gdf.index.get_indexer(edges_gdf['v'])
+        adjacency = csr_matrix((np.ones(len(ix_u)), (ix_u, ix_v)), shape = (len(nodes_gdf), len(nodes_gdf)))
+        n_components, labels = connected_components(adjacency, directed = False)
+        if n_components > 1:  
+            # keeping only the largest component
+            largest_component = np.bincount(labels).argmax()
+            nodes_gdf = nodes_gdf[labels == largest_component]
             edges_gdf = edges_gdf[(edges_gdf.u.isin(nodes_gdf.nodeID)) & (edges_gdf.v.isin(nodes_gdf.nodeID))]   
 
     edges_gdf.set_index('edgeID', drop = False, inplace = True, append = False)
@@ -414,6 +471,7 @@ def fix_network_topology(nodes_gdf, edges_gdf):
         edges_gdf['tunnel'] = edges_gdf['tunnel'].astype(int)
         
     old_edges_gdf = edges_gdf.copy()
+    sindex = old_edges_gdf.sindex # spatial index, built once
     
     for row in old_edges_gdf.itertuples():
         if (bridges) & (old_edges_gdf.loc[row.Index].bridge != 0):
@@ -422,7 +480,9 @@ def fix_network_topology(nodes_gdf, edges_gdf):
             continue # tunnels are not checked
         
         line_geometry = old_edges_gdf.loc[row.Index].geometry
-        tmp = old_edges_gdf[old_edges_gdf.geometry.intersects(line_geometry)].copy()
+        possible_matches_index = list(sindex.intersection(line_geometry.bounds))
+        possible_matches = old_edges_gdf.iloc[possible_matches_index]
+        tmp = possible_matches[possible_matches.geometry.intersects(line_geometry)].copy()
         tmp.drop(row.Index, axis = 0, inplace = True)
         
         union = tmp.unary_union
@@ -533,11 +593,19 @@ def correct_edges(nodes_gdf, edges_gdf):
     GeoDataFrame
     """
 
-    edges_gdf['geometry'] = edges_gdf.apply(lambda row: _update_line_geometry_coords(row['u'], row['v'], nodes_gdf, row['geometry']), axis=1)
+    # looking up the u and v nodes' coordinates once for all the edges
+    x, y = nodes_gdf['x'].to_numpy(), nodes_gdf['y'].to_numpy()
+    ix_u, ix_v = nodes_gdf.index.get_indexer(edges_gdf['u']), nodes_gdf.index.get_indexer(edges_gdf['v'])
+    missing = (ix_u < 0) | (ix_v < 0)
+    if missing.any():
+        not_found = set(edges_gdf['u'][ix_u < 0]) | set(edges_gdf['v'][ix_v < 0])
+        raise KeyError(sorted(not_found))
+    edges_gdf['geometry'] = [_update_line_geometry_coords(line_geometry, (x[u], y[u]), (x[v], y[v])) 
+                                for line_geometry, u, v in zip(edges_gdf['geometry'], ix_u, ix_v)]
                                             
     return edges_gdf
 
-def _update_line_geometry_coords(u, v, nodes_gdf, line_geometry):
+def _update_line_geometry_coords(line_geometry, u_coords, v_coords):
 
     """
     It supports the correct_edges function checks that the edges coordinates are consistent with their relative u and v nodes'coordinates.
@@ -545,14 +613,12 @@ def _update_line_geometry_coords(u, v, nodes_gdf, line_geometry):
     
     Parameters
     ----------
-    u: int
-        the nodeID of the from node of the geometry
-    v: int
-        the nodeID of the to node of the geometry
-    nodes_gdf: Point GeoDataFrame
-        nodes (junctions) GeoDataFrame 
     line_geometry: LineString
         a street segment geometry
+    u_coords: tuple
+        the coordinates of the from node of the geometry
+    v_coords: tuple
+        the coordinates of the to node of the geometry
         
     Returns
     -------
@@ -560,12 +626,55 @@ def _update_line_geometry_coords(u, v, nodes_gdf, line_geometry):
     """
     
     line_coords = list(line_geometry.coords)
-    line_coords[0] = (nodes_gdf.loc[u]['x'], nodes_gdf.loc[u]['y'])
-    line_coords[-1] = (nodes_gdf.loc[v]['x'], nodes_gdf.loc[v]['y'])
-    new_line_geometry = LineString([coor for coor in line_coords])
+    line_coords[0] = u_coords
+    line_coords[-1] = v_coords
+    new_line_geometry = LineString(line_coords)
     
     return new_line_geometry
 
+def _edges_code(edges_gdf):
+    """
+    It returns a code identifying each edge by its pair of nodes, regardless of their order. 
+    The nodeIDs (any integer, also negative or above 2**32) are first mapped to compact non-negative integers; the lower and the higher
+    of these are then packed in the upper and lower 32 bits of an unsigned integer. Codes are thus only comparable within the same call.
+    
+    Parameters
+    ----------
+    edges_gdf: LineString GeoDataFrame
+        street segments GeoDataFrame
+    
+    Returns
+    -------
+    numpy array
+    """
+    
+    nodes, _ = pd.factorize(np.concatenate([edges_gdf['u'].to_numpy(), edges_gdf['v'].to_numpy()]))
+    nodes = nodes.astype(np.uint64)
+    u, v = nodes[:len(edges_gdf)], nodes[len(edges_gdf):]
+    return (np.minimum(u, v) << np.uint64(32)) | np.maximum(u, v)
+
+def _duplicate_candidates(edges_gdf, dirty = None):
+    """
+    It supports the clean_network function by identifying the edges that may be duplicates, namely edges whose code (see _edges_code) is repeated.
+    When the edges modified in the previous cycle are provided, only the codes shared with these edges are considered.
+    
+    Parameters
+    ----------
+    edges_gdf: LineString GeoDataFrame
+        street segments GeoDataFrame, with a 'code' column
+    dirty: Index
+        the edgeIDs (index labels) of the edges modified in the previous cycle; when None, all the edges are considered
+    
+    Returns
+    -------
+    boolean Series
+    """
+    
+    candidates = edges_gdf['code'].duplicated(keep = False)
+    if dirty is not None:
+        candidates &= edges_gdf['code'].isin(edges_gdf['code'][edges_gdf.index.isin(dirty)])
+    return candidates
+
 class Error(Exception):
     """Base class for other exceptions"""
 
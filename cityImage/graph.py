@@ -291,7 +291,21 @@ def nodes_degree(edges_gdf):
     dictionary
     """
 
-    dd_u = dict(edges_gdf['u'].value_counts())
-    dd_v = dict(edges_gdf['v'].value_counts())
-    dd = {k: dd_u.get(k, 0) + dd_v.get(k, 0) for k in set(dd_u) | set(dd_v)}
-    return dd 
\ No newline at end of file
+    dd = dict(_nodes_degree(edges_gdf))
+    return dd
+
+def _nodes_degree(edges_gdf):
+    """
+    It returns a Series where the index contains the nodes identifiers and the values their degree, computed in one pass over the concatenated u and v columns.
+    
+    Parameters
+    ----------
+    edges_gdf: LineString GeoDataFrame
+        street segments GeoDataFrame
+    
+    Returns
+    -------
+    Series
+    """
+    
+    return pd.concat([edges_gdf['u'], edges_gdf['v']], ignore_index = True).value_counts() 
\ No newline at end of file
@@ -242,12 +242,12 @@ def reset_index_street_network_gdfs(nodes_gdf, edges_gdf):
     nodes_gdf = nodes_gdf.reset_index(drop = True)
     nodes_gdf["nodeID"] = nodes_gdf.index.values.astype("int64")
     
-    edges_gdf = pd.merge(edges_gdf, nodes_gdf[["old_nodeID", "nodeID"]], how="left", left_on="old_u", right_on="old_nodeID")
-    edges_gdf = edges_gdf.rename(columns = {"nodeID":"u"})
-    edges_gdf = pd.merge(edges_gdf, nodes_gdf[["old_nodeID", "nodeID"]], how="left", left_on="old_v", right_on="old_nodeID")
-    edges_gdf = edges_gdf.rename(columns = {"nodeID":"v"})
+    # relabelling u and v with the new nodeIDs
+    mapping = dict(zip(nodes_gdf["old_nodeID"].to_numpy(), nodes_gdf["nodeID"].to_numpy()))
+    edges_gdf["u"] = edges_gdf["old_u"].map(mapping).astype("int64")
+    edges_gdf["v"] = edges_gdf["old_v"].map(mapping).astype("int64")
 
-    edges_gdf.drop(["old_u", "old_nodeID_x", "old_nodeID_y", "old_v"], axis = 1, inplace = True)
+    edges_gdf.drop(["old_u", "old_v"], axis = 1, inplace = True)
     nodes_gdf.drop(["old_nodeID", "index"], axis = 1, inplace = True, errors = "ignore")
     edges_gdf = edges_gdf.reset_index(drop=True)
     edges_gdf["edgeID"] = edges_gdf.index.values.astype(int)
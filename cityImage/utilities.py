@@ -81,15 +81,9 @@ def center_line(line_geometryA, line_geometryB):
             index = int(len(line_coordsB)/2)
             del line_coordsB[index]          
     
-        new_line = line_coordsA
-        for n, i in enumerate(line_coordsA):
-            link = LineString([coor for coor in [line_coordsA[n], line_coordsB[n]]])
-            np = link.centroid.coords[0]       
-            new_line[n] = np
-            
-        new_line[0] = line_coordsA[0]
-        new_line[-1] = line_coordsA[-1]
-        center_line = LineString([coor for coor in new_line])
+        # midpoints of the links between corresponding vertexes, computed at once
+        new_line = (np.array(line_coordsA) + np.array(line_coordsB)) / 2.0
+        center_line = LineString(new_line)
 
     return center_line
 
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from cityImage.cleaning_network import _edges_code, _duplicate_candidates
+
+def test_edges_code_large_and_negative_nodeIDs():
+    edges_gdf = pd.DataFrame({'u': [1, 0, 4294967301, -1, -2], 'v': [4294967301, 4294967301, 1, 5, -1]})
+    code = _edges_code(edges_gdf)
+    # (1, 4294967301) and (4294967301, 1) are the same pair, all the others differ
+    assert code[0] == code[2]
+    assert len(set(code)) == 4
+
+def test_duplicate_candidates_restricted_to_dirty():
+    # edges 10 and 11 share their nodes, as do 12 and 13; 14 and 15 would collide when packing raw nodeIDs
+    edges_gdf = pd.DataFrame({'u': [1, 2, 3, 4, 1, 0], 'v': [2, 1, 4, 3, 4294967301, 4294967301]}, index = [10, 11, 12, 13, 14, 15])
+    edges_gdf['code'] = _edges_code(edges_gdf)
+    
+    assert list(edges_gdf.index[_duplicate_candidates(edges_gdf)]) == [10, 11, 12, 13]
+    assert list(edges_gdf.index[_duplicate_candidates(edges_gdf, pd.Index([11]))]) == [10, 11]
+    assert list(edges_gdf.index[_duplicate_candidates(edges_gdf, pd.Index([14]))]) == []